@@ -5,7 +5,7 @@ import concurrent.futures
 import functools
 import logging
 import threading
-from typing import Callable, Any, Union
+from typing import Callable, Any, Optional, Union
 
 import ray
 import ray.core.generated.ray_client_pb2 as ray_client_pb2
@@ -230,11 +230,44 @@ cdef class ClientObjectRef(ObjectRef):
         fut.object_ref = self
         return fut
 
-    def _on_completed(self, py_callback: Callable[[Any], None]) -> None:
+    def as_future(self, _internal=False) -> asyncio.Future:
+        """Wrap ClientObjectRef with an asyncio.Future.
+
+        The result is deserialized on the event loop the future belongs to.
+        Note that the future cancellation will not cancel the correspoding
+        task when the ClientObjectRef representing return object of a task.
+        """
+        if not _internal:
+            logger.warning("ref.as_future() is deprecated in favor of "
+                           "asyncio.wrap_future(ref.future()).")
+        loop = asyncio.get_event_loop()
+        fut = loop.create_future()
+
+        def set_future(data: Any, object_ref) -> None:
+            """Sets the exception or result in the asyncio Future. The
+            object ref is passed in only to keep it alive until then."""
+            if fut.done():
+                # The awaiting coroutine was cancelled.
+                return
+            if isinstance(data, Exception):
+                fut.set_exception(data)
+            else:
+                fut.set_result(data)
+
+        # Deserialize the result on the awaiting event loop, rather than on
+        # the data client's thread that dispatches all responses.
+        self._on_completed(
+            functools.partial(set_future, object_ref=self), loop)
+        return fut
+
+    def _on_completed(self, py_callback: Callable[[Any], None],
+                      loop: Optional[asyncio.AbstractEventLoop] = None
+                      ) -> None:
         """Register a callback that will be called after Object is ready.
         If the ObjectRef is already ready, the callback will be called soon.
         The callback should take the result as the only argument. The result
-        can be an exception object in case of task error.
+        can be an exception object in case of task error. If loop is given,
+        the callback is run on that event loop.
         """
         from ray.util.client.client_pickler import loads_from_server
 
@@ -252,7 +285,7 @@ cdef class ClientObjectRef(ObjectRef):
 
             py_callback(data)
 
-        client.ray._register_callback(self, deserialize_obj)
+        client.ray._register_callback(self, deserialize_obj, loop)
 
     cdef _set_id(self, id):
         check_id(id)
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import pytest
 import time
@@ -259,6 +260,29 @@ def test_wait(ray_start_regular_shared):
             ray.wait(["blabla"])
 
 
+@pytest.mark.skipif(sys.platform == "win32", reason="Failing on Windows.")
+def test_await_object_ref(ray_start_regular_shared):
+    with ray_start_client_server() as ray:
+
+        @ray.remote
+        def f(x):
+            return x + 1
+
+        @ray.remote
+        def g(fake_path):
+            with open(fake_path, "r") as f:
+                f.read()
+
+        async def main():
+            assert await f.remote(1) == 2
+            assert await asyncio.gather(f.remote(2), f.remote(3)) == [3, 4]
+            # Task errors are raised from the awaiting coroutine.
+            with pytest.raises(FileNotFoundError):
+                await g.remote("not_a_real_file")
+
+        asyncio.get_event_loop().run_until_complete(main())
+
+
 @pytest.mark.skipif(sys.platform == "win32", reason="Failing on Windows.")
 def test_remote_functions(ray_start_regular_shared):
     with ray_start_client_server() as ray:
@@ -770,5 +794,38 @@ def test_init_requires_no_resources(call_ray_start, use_client):
     ray.get(f.remote())
 
 
+def test_data_requests_batching():
+    """
+    Requests coalesced by the data client are unwrapped in order by the
+    server, and lone requests are sent without an envelope.
+    """
+    import ray.core.generated.ray_client_pb2 as ray_client_pb2
+    from ray.util.client.dataclient import _coalesce_requests
+    from ray.util.client.server.dataservicer import fill_queue
+
+    reqs = [
+        ray_client_pb2.DataRequest(
+            req_id=i, release=ray_client_pb2.ReleaseRequest(ids=[b"a"]))
+        for i in range(1, 6)
+    ]
+    single = list(_coalesce_requests(reqs[:1]))
+    assert single == reqs[:1]
+
+    batched = list(_coalesce_requests(reqs))
+    assert len(batched) == 1
+    assert batched[0].WhichOneof("type") == "batch"
+
+    output_queue = queue.Queue()
+    fill_queue(iter(batched + single), output_queue)
+    received = list(iter(output_queue.get, None))
+    assert [req.req_id for req in received] == [1, 2, 3, 4, 5, 1]
+
+    with patch("ray.util.client.dataclient.DATA_BATCH_MAX_BYTES",
+               reqs[0].ByteSize() * 2):
+        batched = list(_coalesce_requests(reqs))
+    assert [req.WhichOneof("type") for req in batched] == \
+        ["batch", "batch", "release"]
+
+
 if __name__ == "__main__":
     sys.exit(pytest.main(["-v", __file__]))
@@ -249,6 +249,24 @@ def test_prepare_runtime_init_req_fails():
         proxier.prepare_runtime_init_req(put_req)
 
 
+def test_split_init_req():
+    """
+    Check that an InitRequest batched with other requests is split off
+    the first message of a stream, and that bare requests pass through.
+    """
+    init_req = ray_client_pb2.DataRequest(
+        req_id=1, init=ray_client_pb2.InitRequest())
+    put_req = ray_client_pb2.DataRequest(
+        req_id=2, put=ray_client_pb2.PutRequest())
+    assert proxier.split_init_req(init_req) == (init_req, [])
+
+    batch_req = ray_client_pb2.DataRequest(
+        batch=ray_client_pb2.DataRequests(reqs=[init_req, put_req]))
+    first, rest = proxier.split_init_req(batch_req)
+    assert first == init_req
+    assert rest == [put_req]
+
+
 def test_prepare_runtime_init_req_no_modification():
     """
     Check that `prepare_runtime_init_req` properly extracts the JobConfig.
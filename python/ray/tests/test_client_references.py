@@ -174,6 +174,31 @@ def test_delete_ref_on_object_deletion(ray_start_regular):
         wait_for_condition(server_object_ref_count(server, 1), timeout=5)
 
 
+def test_delete_refs_in_bulk(ray_start_regular):
+    with ray_start_client_server_pair() as pair:
+        ray, server = pair
+        keep = ray.put("This value stays")
+        # More refs than fit in one batch of releases, so that releases are
+        # flushed both on the batch size and on the flush timer.
+        refs = [ray.put(i) for i in range(300)]
+        wait_for_condition(server_object_ref_count(server, 301), timeout=5)
+
+        del refs
+
+        wait_for_condition(server_object_ref_count(server, 1), timeout=5)
+        assert ray.get(keep) == "This value stays"
+
+        refs = [ray.put(i) for i in range(10)]
+        wait_for_condition(server_object_ref_count(server, 11), timeout=5)
+
+        del refs
+        # The buffered releases are sent ahead of the put, and the server
+        # handles them in order, so they are done once the put returns.
+        after = ray.put("after")
+        assert server_object_ref_count(server, 2)()
+        assert ray.get(after) == "after"
+
+
 @pytest.mark.parametrize(
     "ray_start_cluster", [{
         "num_nodes": 1,
@@ -0,0 +1,505 @@
+"""Unit tests for the DataClient, run against a stubbed Datapath stream
+rather than a real Ray client server."""
+import asyncio
+import contextlib
+import queue
+import sys
+import threading
+from unittest.mock import Mock, patch
+
+import grpc
+import pytest
+
+import ray.core.generated.ray_client_pb2 as ray_client_pb2
+from ray._private.test_utils import wait_for_condition
+from ray.util.client.dataclient import DataClient, RELEASE_BATCH_SIZE
+
+
+class FakeDatapath:
+    """
+    Stands in for the gRPC channel of a DataClient. Requests read off the
+    stream are recorded in `requests`, with batches unwrapped like the
+    server does, and answered by `handler` if it returns a response.
+    Responses can also be fed in with respond(), and the stream ended with
+    end() or broken with fail().
+    """
+
+    def __init__(self, handler=None, consume=True):
+        self.handler = handler
+        # Number of times the stream was (re)started.
+        self.streams = 0
+        self.requests = queue.Queue()
+        self._responses = queue.Queue()
+        # Cleared to stop reading requests off the stream, which leaves
+        # them on the data client's request queue.
+        self.consume = threading.Event()
+        if consume:
+            self.consume.set()
+
+    def stream_stream(self,
+                      method,
+                      request_serializer=None,
+                      response_deserializer=None,
+                      **kwargs):
+        assert method == "/ray.rpc.RayletDataStreamer/Datapath"
+        self._deserialize = response_deserializer
+        return self._datapath
+
+    def _datapath(self, request_iterator, metadata=None, wait_for_ready=None):
+        self.streams += 1
+        threading.Thread(
+            target=self._read, args=(request_iterator, ), daemon=True).start()
+        return self._iter_responses()
+
+    def _read(self, request_iterator):
+        while True:
+            self.consume.wait()
+            try:
+                req = next(request_iterator)
+            except StopIteration:
+                self.end()
+                return
+            if req.WhichOneof("type") == "batch":
+                reqs = list(req.batch.reqs)
+            else:
+                reqs = [req]
+            for r in reqs:
+                self.requests.put(r)
+                resp = self.handler(r) if self.handler else None
+                if resp is not None:
+                    self.respond(r.req_id, resp)
+
+    def _iter_responses(self):
+        while True:
+            item = self._responses.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield self._deserialize(item)
+
+    def respond(self, req_id, resp):
+        resp.req_id = req_id
+        self._responses.put(resp.SerializeToString())
+
+    def end(self):
+        self._responses.put(None)
+
+    def fail(self):
+        self._responses.put(grpc.RpcError())
+
+    def next_request(self, timeout=5):
+        return self.requests.get(timeout=timeout)
+
+
+class FakeWorker:
+    def __init__(self, channel, reconnect=False):
+        self.channel = channel
+        self._in_shutdown = False
+        # Skips acknowledgements, which would only add noise to the
+        # recorded requests.
+        self._reconnect_enabled = False
+        self._reconnect = reconnect
+
+    def _can_reconnect(self, e):
+        return self._reconnect
+
+    def ping_server(self, timeout=None):
+        return True
+
+
+@contextlib.contextmanager
+def data_client(datapath, reconnect=False):
+    client = DataClient(FakeWorker(datapath, reconnect), "client_id", [])
+    try:
+        yield client
+    finally:
+        datapath.consume.set()
+        with patch("ray.util.disconnect"):
+            client.close()
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def get_request():
+    return ray_client_pb2.GetRequest(ids=[b"a"])
+
+
+def answer(req):
+    req_type = req.WhichOneof("type")
+    if req_type == "init":
+        return ray_client_pb2.DataResponse(
+            init=ray_client_pb2.InitResponse(ok=True))
+    if req_type == "get":
+        return ray_client_pb2.DataResponse(
+            get=ray_client_pb2.GetResponse(valid=True, data=b"value"))
+    if req_type == "put":
+        return ray_client_pb2.DataResponse(
+            put=ray_client_pb2.PutResponse(valid=True, id=b"id"))
+    return None
+
+
+def test_async_requests():
+    datapath = FakeDatapath(handler=answer)
+    with data_client(datapath) as client:
+
+        async def send_all():
+            return await asyncio.gather(
+                client.InitAsync(ray_client_pb2.InitRequest()),
+                client.GetObjectAsync(ray_client_pb2.GetRequest(ids=[b"a"])),
+                client.PutObjectAsync(ray_client_pb2.PutRequest(data=b"b")))
+
+        init, get, put = run(send_all())
+        assert init.ok
+        assert get.valid and get.data == b"value"
+        assert put.valid and put.id == b"id"
+        assert not client._pending
+        assert not client.outstanding_requests
+
+
+def test_async_request_cancelled():
+    # Nothing answers the request, so it stays in flight until cancelled.
+    datapath = FakeDatapath()
+    with data_client(datapath) as client:
+
+        async def cancel_get():
+            task = asyncio.ensure_future(
+                client.GetObjectAsync(ray_client_pb2.GetRequest(ids=[b"a"])))
+            await asyncio.sleep(0.1)
+            assert len(client._pending) == 1
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        run(cancel_get())
+        req = datapath.next_request()
+        assert not client._pending
+        assert not client.outstanding_requests
+        # A late response for the cancelled request is dropped.
+        datapath.respond(req.req_id, answer(req))
+        datapath.handler = answer
+        assert run(client.InitAsync(ray_client_pb2.InitRequest())).ok
+
+
+def test_async_request_shutdown():
+    datapath = FakeDatapath()
+    with data_client(datapath) as client:
+
+        async def get_during_shutdown():
+            task = asyncio.ensure_future(
+                client.GetObjectAsync(ray_client_pb2.GetRequest(ids=[b"a"])))
+            await asyncio.sleep(0.1)
+            # The stream ends before the request is answered, which resolves
+            # the request's future with None.
+            datapath.end()
+            with patch("ray.util.disconnect") as disconnect:
+                with pytest.raises(ConnectionError):
+                    await task
+            assert disconnect.called
+
+        run(get_during_shutdown())
+        assert not client._pending
+
+        # New requests fail right away once the client is shut down.
+        with patch("ray.util.disconnect"):
+            with pytest.raises(ConnectionError):
+                run(client.InitAsync(ray_client_pb2.InitRequest()))
+
+
+def release_data_request(req_id):
+    return ray_client_pb2.DataRequest(
+        req_id=req_id, release=ray_client_pb2.ReleaseRequest(ids=[b"a"]))
+
+
+def batched_req_ids(messages):
+    return [[req.req_id for req in msg.batch.reqs]
+            if msg.WhichOneof("type") == "batch" else [msg.req_id]
+            for msg in messages]
+
+
+def test_iter_requests_batches():
+    client = Mock()
+    request_queue = queue.SimpleQueue()
+    for req_id in [1, 2, 3, 0, 4]:
+        request_queue.put(release_data_request(req_id))
+    # The sentinel ends the stream in the middle of a batch, after sending
+    # the requests queued before it.
+    request_queue.put(None)
+    request_queue.put(release_data_request(5))
+
+    with patch("ray.util.client.dataclient.DATA_BATCH_MAX_REQUESTS", 3):
+        messages = list(DataClient._iter_requests(client, request_queue))
+    assert batched_req_ids(messages) == [[1, 2, 3], [0, 4]]
+    # The acknowledgement with req_id 0 doesn't hold a queue slot.
+    assert [c.args for c in client._release_queue_slots.call_args_list] == \
+        [(3, ), (1, )]
+
+
+def test_iter_requests_batch_window():
+    client = Mock()
+    request_queue = queue.SimpleQueue()
+    request_queue.put(release_data_request(1))
+    threading.Timer(0.05, request_queue.put,
+                    (release_data_request(2), )).start()
+
+    # Without a window, only requests that are already queued are batched.
+    messages = DataClient._iter_requests(client, request_queue)
+    assert batched_req_ids([next(messages)]) == [[1]]
+    assert batched_req_ids([next(messages)]) == [[2]]
+
+    request_queue.put(release_data_request(3))
+    threading.Timer(0.05, request_queue.put,
+                    (release_data_request(4), )).start()
+    with patch("ray.util.client.dataclient.DATA_BATCH_WINDOW_S", 5):
+        # Requests arriving within the window are batched with the first.
+        # The window is cut short once the stream ends.
+        threading.Timer(0.1, request_queue.put, (None, )).start()
+        messages = DataClient._iter_requests(client, request_queue)
+        assert batched_req_ids(messages) == [[3, 4]]
+
+@pytest.fixture
+def small_queue():
+    with patch("ray.util.client.dataclient.DATA_REQUEST_QUEUE_SIZE", 2):
+        yield 2
+
+
+def test_full_queue_blocks_senders(small_queue):
+    datapath = FakeDatapath(consume=False)
+    with data_client(datapath) as client:
+        for _ in range(small_queue):
+            client.RegisterGetCallback(get_request(), lambda resp: None)
+        assert client._queued_requests == small_queue
+
+        sender = threading.Thread(
+            target=client.RegisterGetCallback,
+            args=(get_request(), lambda resp: None))
+        sender.start()
+        sender.join(0.2)
+        assert sender.is_alive()
+
+        datapath.consume.set()
+        sender.join(5)
+        assert not sender.is_alive()
+        for _ in range(small_queue + 1):
+            assert datapath.next_request().WhichOneof("type") == "get"
+        assert client._queued_requests == 0
+
+
+def test_acknowledgements_dont_count(small_queue):
+    datapath = FakeDatapath(consume=False)
+    with data_client(datapath) as client:
+        with client.lock:
+            for _ in range(3):
+                client.request_queue.put(
+                    ray_client_pb2.DataRequest(
+                        acknowledge=ray_client_pb2.AcknowledgeRequest(
+                            req_id=1)))
+        client.RegisterGetCallback(get_request(), lambda resp: None)
+        assert client._queued_requests == 1
+
+        datapath.consume.set()
+        for _ in range(4):
+            datapath.next_request()
+        assert client._queued_requests == 0
+
+
+def test_data_thread_doesnt_block(small_queue):
+    datapath = FakeDatapath(consume=False)
+    with data_client(datapath) as client:
+        sent = threading.Event()
+
+        def send_from_callback(resp):
+            # Runs on the data thread, which must not wait for the queue it
+            # is responsible for draining.
+            client.RegisterGetCallback(get_request(), lambda resp: None)
+            sent.set()
+
+        client.RegisterGetCallback(get_request(), send_from_callback)
+        client.RegisterGetCallback(get_request(), lambda resp: None)
+        first_req_id = next(iter(client.outstanding_requests))
+        datapath.respond(
+            first_req_id,
+            ray_client_pb2.DataResponse(
+                get=ray_client_pb2.GetResponse(valid=True)))
+        assert sent.wait(5)
+        assert client._queued_requests == small_queue + 1
+
+        datapath.consume.set()
+        for _ in range(small_queue + 1):
+            datapath.next_request()
+        assert client._queued_requests == 0
+
+
+def test_reconnect_keeps_reserved_slots():
+    datapath = FakeDatapath(consume=False)
+    with data_client(datapath, reconnect=True) as client:
+        client.RegisterGetCallback(get_request(), lambda resp: None)
+        # A sender that reserved a slot, but hasn't queued its request yet.
+        client._acquire_queue_slot()
+        assert client._queued_requests == 2
+
+        datapath.fail()
+        wait_for_condition(lambda: datapath.streams == 2)
+        with client.lock:
+            # The dropped request is counted again once it is resent.
+            assert client._queued_requests == 2
+
+        datapath.consume.set()
+        assert datapath.next_request().WhichOneof("type") == "get"
+        client._release_queue_slots(1)
+        wait_for_condition(lambda: client._queued_requests == 0)
+
+
+def test_shutdown_wakes_blocked_senders(small_queue):
+    datapath = FakeDatapath(consume=False)
+    with data_client(datapath) as client:
+        for _ in range(small_queue):
+            client.RegisterGetCallback(get_request(), lambda resp: None)
+
+        errors = []
+
+        def send():
+            try:
+                client.RegisterGetCallback(get_request(), lambda resp: None)
+            except ConnectionError as e:
+                errors.append(e)
+
+        with patch("ray.util.disconnect"):
+            sender = threading.Thread(target=send)
+            sender.start()
+            sender.join(0.2)
+            assert sender.is_alive()
+            datapath.end()
+            sender.join(5)
+        assert not sender.is_alive()
+        assert len(errors) == 1
+
+
+def test_full_queue_doesnt_block_event_loop(small_queue):
+    datapath = FakeDatapath(consume=False)
+    with data_client(datapath) as client:
+        for _ in range(small_queue):
+            client.RegisterGetCallback(get_request(), lambda resp: None)
+
+        async def get_with_full_queue():
+            cancelled = asyncio.ensure_future(
+                client.GetObjectAsync(get_request()))
+            task = asyncio.ensure_future(client.GetObjectAsync(get_request()))
+            await asyncio.sleep(0.1)
+            assert not task.done()
+            assert len(client._slot_waiters) == 2
+
+            cancelled.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await cancelled
+            assert len(client._slot_waiters) == 1
+            assert client._queued_requests == small_queue
+
+            datapath.handler = answer
+            datapath.consume.set()
+            return await task
+
+        resp = run(get_with_full_queue())
+        assert resp.valid and resp.data == b"value"
+        assert not client._slot_waiters
+
+
+def release_request(*ids):
+    return ray_client_pb2.ReleaseRequest(ids=list(ids))
+
+
+def test_releases_flushed_in_bulk():
+    datapath = FakeDatapath()
+    with data_client(datapath) as client:
+        num_threads = threading.active_count()
+        for burst in range(3):
+            ids = [f"{burst}-{i}".encode() for i in range(5)]
+            for object_id in ids:
+                client.ReleaseObject(release_request(object_id))
+            req = datapath.next_request()
+            assert req.WhichOneof("type") == "release"
+            assert list(req.release.ids) == ids
+        # The buffer is flushed by the same thread every time.
+        assert threading.active_count() == num_threads
+
+        # Destructors can release objects from a garbage collection pass
+        # that runs while the release lock is held.
+        with client._release_lock:
+            client.ReleaseObject(release_request(b"gc"))
+        assert list(datapath.next_request().release.ids) == [b"gc"]
+
+
+def test_releases_ordered_before_requests():
+    datapath = FakeDatapath(handler=answer)
+    # Only flush the buffered releases ahead of the requests that follow.
+    with patch("ray.util.client.dataclient.RELEASE_FLUSH_INTERVAL_S", 60), \
+            data_client(datapath) as client:
+        client.ReleaseObject(release_request(b"a"))
+        assert client.PutObject(ray_client_pb2.PutRequest(data=b"b")).valid
+        assert datapath.next_request().WhichOneof("type") == "release"
+        assert datapath.next_request().WhichOneof("type") == "put"
+
+        client.ReleaseObject(release_request(b"b"))
+        resp = run(client.GetObjectAsync(get_request()))
+        assert resp.valid
+        assert datapath.next_request().WhichOneof("type") == "release"
+        assert datapath.next_request().WhichOneof("type") == "get"
+
+
+def test_full_release_batch_doesnt_block(small_queue):
+    datapath = FakeDatapath(consume=False)
+    with data_client(datapath) as client:
+        for _ in range(small_queue):
+            client.RegisterGetCallback(get_request(), lambda resp: None)
+
+        ids = [str(i).encode() for i in range(RELEASE_BATCH_SIZE)]
+
+        def release_all():
+            # As if run by destructors during a garbage collection pass on
+            # a thread holding the lock.
+            with client.lock:
+                for object_id in ids:
+                    client.ReleaseObject(release_request(object_id))
+
+        releaser = threading.Thread(target=release_all)
+        releaser.start()
+        releaser.join(5)
+        assert not releaser.is_alive()
+
+        datapath.consume.set()
+        for _ in range(small_queue):
+            assert datapath.next_request().WhichOneof("type") == "get"
+        assert list(datapath.next_request().release.ids) == ids
+
+
+def test_releases_not_overtaken(small_queue):
+    for _ in range(20):
+        datapath = FakeDatapath(consume=False)
+        with data_client(datapath) as client:
+            for _ in range(small_queue):
+                client.RegisterGetCallback(get_request(), lambda resp: None)
+            for i in range(RELEASE_BATCH_SIZE):
+                client.ReleaseObject(release_request(str(i).encode()))
+            # Races the release thread for the next free slot.
+            sender = threading.Thread(
+                target=client.RegisterGetCallback,
+                args=(get_request(), lambda resp: None))
+            sender.start()
+
+            datapath.consume.set()
+            sender.join(5)
+            types = [
+                datapath.next_request().WhichOneof("type")
+                for _ in range(small_queue + 2)
+            ]
+            assert types == ["get"] * small_queue + ["release", "get"]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main(["-v", __file__]))
@@ -1,6 +1,7 @@
 """This file defines the interface between the ray client worker
 and the overall ray module API.
 """
+import asyncio
 from concurrent.futures import Future
 import json
 import logging
@@ -341,6 +342,9 @@ class ClientAPI:
                 "implemented in the client API.".format(key))
         return self.__getattribute__(key)
 
-    def _register_callback(self, ref: "ClientObjectRef",
-                           callback: Callable[["DataResponse"], None]) -> None:
-        self.worker.register_callback(ref, callback)
+    def _register_callback(self,
+                           ref: "ClientObjectRef",
+                           callback: Callable[["DataResponse"], None],
+                           loop: Optional[asyncio.AbstractEventLoop] = None
+                           ) -> None:
+        self.worker.register_callback(ref, callback, loop)
@@ -62,9 +62,14 @@ GRPC_KEEPALIVE_TIME_MS = 1000 * 30
 # Long timeout because we do not want gRPC ending a connection.
 GRPC_KEEPALIVE_TIMEOUT_MS = 1000 * 600
 
+# 1 MiB per stream, up from the gRPC default of 64 KiB.
+GRPC_WRITE_BUFFER_SIZE = 1024 * 1024
+
 GRPC_OPTIONS = [
     ("grpc.max_send_message_length", GRPC_MAX_MESSAGE_SIZE),
     ("grpc.max_receive_message_length", GRPC_MAX_MESSAGE_SIZE),
+    # Keepalives are HTTP/2 pings sent by the gRPC core, so neither the
+    # client nor the server needs a keepalive thread of its own.
     ("grpc.keepalive_time_ms", GRPC_KEEPALIVE_TIME_MS),
     ("grpc.keepalive_timeout_ms", GRPC_KEEPALIVE_TIMEOUT_MS),
     ("grpc.keepalive_permit_without_calls", 1),
@@ -73,7 +78,11 @@ GRPC_OPTIONS = [
     ("grpc.http2.min_ping_interval_without_data_ms",
      GRPC_KEEPALIVE_TIME_MS - 50),
     # Allow many strikes
-    ("grpc.http2.max_ping_strikes", 0)
+    ("grpc.http2.max_ping_strikes", 0),
+    # Let the data channel queue more bytes per stream before blocking.
+    # These options are shared by the client, server and proxier channels,
+    # so this applies on both ends of the connection.
+    ("grpc.http2.write_buffer_size", GRPC_WRITE_BUFFER_SIZE),
 ]
 
 CLIENT_SERVER_MAX_THREADS = float(
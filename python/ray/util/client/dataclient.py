@@ -1,13 +1,19 @@
 """This file implements a threaded stream controller to abstract a data stream
 back to the ray clientserver.
 """
+import asyncio
+import itertools
 import logging
+import os
 import queue
 import threading
+import time
 import grpc
 
-from collections import OrderedDict
-from typing import Any, Callable, Dict, TYPE_CHECKING, Optional, Union
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import (Any, Callable, Deque, Dict, Iterator, List,
+                    TYPE_CHECKING, Optional, Tuple, Union)
 
 import ray.core.generated.ray_client_pb2 as ray_client_pb2
 import ray.core.generated.ray_client_pb2_grpc as ray_client_pb2_grpc
@@ -21,9 +27,124 @@ logger = logging.getLogger(__name__)
 ResponseCallable = Callable[[Union[ray_client_pb2.DataResponse, Exception]],
                             None]
 
+# Returned when popping a req_id that is not in asyncio_waiting_data, whose
+# callbacks may themselves be None.
+_NOT_WAITING = object()
+
+# The future of a request waiting for its response, along with the event
+# loop the future belongs to (None for concurrent.futures.Future).
+PendingResponse = Tuple[Optional[asyncio.AbstractEventLoop],
+                        Union[Future, asyncio.Future]]
+
 # Send an acknowledge on every 32nd response received
 ACKNOWLEDGE_BATCH_SIZE = 32
 
+# How long to wait for more requests after the first one before sending the
+# queued requests to the server. By default only requests that are already
+# queued are coalesced, so that a lone request is never delayed.
+DATA_BATCH_WINDOW_S = float(
+    os.getenv("RAY_CLIENT_DATA_BATCH_WINDOW_MS", 0)) / 1000
+
+# Released object ids are buffered and sent to the server in a single
+# ReleaseRequest once this many have accumulated, or once the flush interval
+# has passed since the first one was buffered. Releases arrive in bursts
+# when many ClientObjectRefs go out of scope together.
+RELEASE_BATCH_SIZE = 128
+RELEASE_FLUSH_INTERVAL_S = 0.01
+
+# Maximum number of requests waiting on the client to be sent to the server.
+# Once it is reached, new requests block until the stream catches up, so a
+# stalled server can't make requests (and the data they carry) pile up in
+# memory without bound.
+DATA_REQUEST_QUEUE_SIZE = int(
+    os.getenv("RAY_CLIENT_DATA_REQUEST_QUEUE_SIZE", 1024))
+
+# Upper bounds on the number of requests and the number of bytes coalesced
+# into a single stream message.
+DATA_BATCH_MAX_REQUESTS = 256
+DATA_BATCH_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _resolve_pending(pending: PendingResponse,
+                     response: Optional[ray_client_pb2.DataResponse]) -> None:
+    """
+    Resolves the future of a waiting request. asyncio futures are resolved
+    on their own event loop, since they are not thread-safe.
+    """
+    loop, future = pending
+    if loop is None:
+        future.set_result(response)
+        return
+
+    def set_result():
+        # The awaiting coroutine may have been cancelled in the meantime.
+        if not future.done():
+            future.set_result(response)
+
+    try:
+        loop.call_soon_threadsafe(set_result)
+    except RuntimeError:
+        # The event loop is closed, so nothing is awaiting the future.
+        pass
+
+
+def _loop_callback(callback: ResponseCallable,
+                   loop: asyncio.AbstractEventLoop) -> ResponseCallable:
+    """
+    Wraps callback so that it runs on the given event loop rather than on
+    the data thread, where a slow callback would hold up every response
+    queued behind it.
+    """
+
+    def call_on_loop(resp: Union[ray_client_pb2.DataResponse, Exception]
+                     ) -> None:
+        try:
+            loop.call_soon_threadsafe(callback, resp)
+        except RuntimeError:
+            # The event loop is closed, so nothing is waiting on the result.
+            logger.debug("Dropping callback for closed event loop.")
+
+    return call_on_loop
+
+
+def _coalesce_requests(batch: List[ray_client_pb2.DataRequest]
+                       ) -> Iterator[ray_client_pb2.DataRequest]:
+    """
+    Packs the given requests into as few stream messages as possible,
+    keeping each message under DATA_BATCH_MAX_BYTES. Requests that end up
+    alone in a message are sent as is, without a wrapping envelope.
+    """
+    if len(batch) == 1:
+        yield batch[0]
+        return
+
+    def wrap(reqs):
+        if len(reqs) == 1:
+            return reqs[0]
+        # Extend the envelope in place: building a DataRequests first and
+        # passing it to the DataRequest constructor would copy every
+        # request twice.
+        envelope = ray_client_pb2.DataRequest()
+        envelope.batch.reqs.extend(reqs)
+        return envelope
+
+    chunk = []
+    chunk_size = 0
+    for req in batch:
+        req_size = req.ByteSize()
+        if chunk and chunk_size + req_size > DATA_BATCH_MAX_BYTES:
+            yield wrap(chunk)
+            chunk = []
+            chunk_size = 0
+        chunk.append(req)
+        chunk_size += req_size
+    yield wrap(chunk)
+
+
+def _release_request(ids: List[bytes]) -> ray_client_pb2.DataRequest:
+    return ray_client_pb2.DataRequest(
+        release=ray_client_pb2.ReleaseRequest(ids=ids))
+
 
 class DataClient:
     def __init__(self, client_worker: "Worker", client_id: str,
@@ -44,36 +165,61 @@ class DataClient:
         self.outstanding_requests: Dict[int, Any] = OrderedDict()
 
         # Serialize access to all mutable internal states: self.request_queue,
-        # self.ready_data, self.asyncio_waiting_data,
-        # self._in_shutdown, self._req_id, self.outstanding_requests and
-        # calling self._next_id()
+        # self.asyncio_waiting_data, self._in_shutdown,
+        # self.outstanding_requests and calling self._next_id()
         self.lock = threading.Lock()
 
-        # Waiting for response or shutdown.
-        self.cv = threading.Condition(lock=self.lock)
-
-        self.request_queue = queue.Queue()
-        self.ready_data: Dict[int, Any] = {}
+        self.request_queue = queue.SimpleQueue()
+        # Number of requests on self.request_queue that count towards
+        # DATA_REQUEST_QUEUE_SIZE. Guarded by self._queue_cv, which senders
+        # wait on while the queue is full.
+        self._queued_requests = 0
+        self._queue_cv = threading.Condition()
+        # Futures of coroutines waiting for room on the request queue, which
+        # can't block their event loop on self._queue_cv. Also guarded by
+        # self._queue_cv, and resolved with None to wake the waiter up.
+        self._slot_waiters: Deque[PendingResponse] = deque()
+        # Futures of blocking and awaiting requests waiting for a response,
+        # keyed by req_id. A future is resolved with None if the data client
+        # shuts down before the response arrives. Entries are only ever
+        # removed with atomic pop()/popitem() calls, so each future is
+        # resolved exactly once and without holding self.lock.
+        self._pending: Dict[int, PendingResponse] = {}
         # NOTE: Dictionary insertion is guaranteed to complete before lookup
         # and/or removal because of synchronization via the request_queue.
         self.asyncio_waiting_data: Dict[int, ResponseCallable] = {}
         self._in_shutdown = False
-        self._req_id = 0
+        self._req_id_gen = itertools.count()
         self._last_exception = None
         self._acknowledge_counter = 0
 
+        # Object ids waiting to be released on the server. Guarded by
+        # self._release_lock rather than self.lock, since ReleaseObject() is
+        # called from ClientObjectRef destructors. Those can run at any
+        # point, including from a garbage collection pass on a thread that
+        # holds either lock, so ReleaseObject() only buffers the ids and
+        # leaves sending them to the release thread.
+        self._release_lock = threading.RLock()
+        self._pending_releases: List[bytes] = []
+        # Notified when releases are buffered, to have the release thread
+        # flush them once RELEASE_BATCH_SIZE have accumulated or after
+        # RELEASE_FLUSH_INTERVAL_S. Shares the reentrant self._release_lock,
+        # so notifying it from a destructor can't deadlock either.
+        self._release_cv = threading.Condition(self._release_lock)
+        self._release_thread = threading.Thread(
+            target=self._release_main,
+            name="ray_client_release_flusher",
+            daemon=True)
+
         self.data_thread.start()
+        self._release_thread.start()
 
-    # Must hold self.lock when calling this function.
+    # Must hold self.lock when calling this function, so that requests are
+    # put on self.request_queue in the order of their ids.
     def _next_id(self) -> int:
-        assert self.lock.locked()
-        self._req_id += 1
-        if self._req_id > INT32_MAX:
-            self._req_id = 1
-        # Responses that aren't tracked (like opportunistic releases)
-        # have req_id=0, so make sure we never mint such an id.
-        assert self._req_id != 0
-        return self._req_id
+        # req_id=0 marks untracked requests and responses (like acks and
+        # connection cleanup), so ids are minted from [1, INT32_MAX].
+        return next(self._req_id_gen) % INT32_MAX + 1
 
     def _start_datathread(self) -> threading.Thread:
         return threading.Thread(
@@ -91,12 +237,28 @@ class DataClient:
                 metadata = self._metadata + \
                     [("reconnecting", str(reconnecting))]
                 resp_stream = stub.Datapath(
-                    iter(self.request_queue.get, None),
+                    self._iter_requests(self.request_queue),
                     metadata=metadata,
                     wait_for_ready=True)
                 try:
+                    # Every response carries the req_id of its request,
+                    # releases included. Only responses nothing waits for,
+                    # in practice just the connection_cleanup one at close,
+                    # have req_id 0. The req_id is read once here and handed
+                    # to _process_response().
+                    process_response = self._process_response
+                    debug_enabled = logger.isEnabledFor(logging.DEBUG)
                     for response in resp_stream:
-                        self._process_response(response)
+                        req_id = response.req_id
+                        if req_id == 0:
+                            # This is not being waited for. Formatting the
+                            # response walks the whole message, so only do
+                            # it when it is actually logged.
+                            if debug_enabled:
+                                logger.debug("Got unawaited response %s",
+                                             response)
+                            continue
+                        process_response(response, req_id)
                     return
                 except grpc.RpcError as e:
                     reconnecting = self._can_reconnect(e)
@@ -110,36 +272,124 @@ class DataClient:
             logger.debug("Shutting down data channel.")
             self._shutdown()
 
-    def _process_response(self, response: Any) -> None:
+    def _iter_requests(self, request_queue: queue.SimpleQueue
+                       ) -> Iterator[ray_client_pb2.DataRequest]:
         """
-        Process responses from the data servicer.
+        Yields requests from request_queue until the None sentinel is seen.
+        Requests that are queued together are coalesced into batches to
+        reduce the per-message overhead of the stream.
         """
-        if response.req_id == 0:
-            # This is not being waited for.
-            logger.debug(f"Got unawaited response {response}")
-            return
-        if response.req_id in self.asyncio_waiting_data:
+        while True:
+            req = request_queue.get()
+            if req is None:
+                return
+            batch = [req]
+            done = False
+            deadline = time.monotonic() + DATA_BATCH_WINDOW_S
+            while len(batch) < DATA_BATCH_MAX_REQUESTS:
+                timeout = deadline - time.monotonic()
+                try:
+                    if timeout > 0:
+                        req = request_queue.get(timeout=timeout)
+                    else:
+                        req = request_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if req is None:
+                    done = True
+                    break
+                batch.append(req)
+            # Acknowledgements and cleanup requests have req_id 0 and don't
+            # take up a slot in the queue.
+            dequeued = sum(1 for req in batch if req.req_id != 0)
+            if dequeued:
+                self._release_queue_slots(dequeued)
+            yield from _coalesce_requests(batch)
+            if done:
+                return
+
+    def _acquire_queue_slot(self) -> None:
+        """
+        Blocks until there is room on the request queue for one more
+        request. The data thread never blocks here, since it is the one
+        that reconnects the stream that drains the queue.
+        """
+        with self._queue_cv:
+            if threading.current_thread().ident != self.data_thread.ident:
+                self._queue_cv.wait_for(
+                    lambda: self._queued_requests < DATA_REQUEST_QUEUE_SIZE
+                    or self._in_shutdown)
+            self._queued_requests += 1
+
+    async def _acquire_queue_slot_async(self) -> None:
+        """
+        Like _acquire_queue_slot(), but waits without blocking the running
+        event loop.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._queue_cv:
+                if (self._queued_requests < DATA_REQUEST_QUEUE_SIZE
+                        or self._in_shutdown):
+                    self._queued_requests += 1
+                    return
+                waiter = (loop, loop.create_future())
+                self._slot_waiters.append(waiter)
             try:
-                # NOTE: calling self.asyncio_waiting_data.pop() results
-                # in the destructor of ClientObjectRef running, which
-                # calls ReleaseObject(). So self.asyncio_waiting_data
-                # is accessed without holding self.lock. Holding the
-                # lock shouldn't be necessary either.
-                callback = self.asyncio_waiting_data.pop(response.req_id)
-                if callback:
-                    callback(response)
-            except Exception:
-                logger.exception("Callback error:")
-            with self.lock:
-                # Update outstanding requests
-                if response.req_id in self.outstanding_requests:
-                    del self.outstanding_requests[response.req_id]
-                    # Acknowledge response
-                    self._acknowledge(response.req_id)
-        else:
-            with self.lock:
-                self.ready_data[response.req_id] = response
-                self.cv.notify_all()
+                await waiter[1]
+            except asyncio.CancelledError:
+                with self._queue_cv:
+                    try:
+                        self._slot_waiters.remove(waiter)
+                    except ValueError:
+                        # Already woken up, so hand the wakeup on to the
+                        # next waiter rather than losing it.
+                        self._wake_slot_waiters(1)
+                raise
+
+    # Must hold self._queue_cv when calling this function.
+    def _wake_slot_waiters(self, count: Optional[int] = None) -> None:
+        """
+        Wakes up count coroutines waiting for room on the request queue, or
+        all of them if count is None.
+        """
+        if count is None:
+            count = len(self._slot_waiters)
+        for _ in range(min(count, len(self._slot_waiters))):
+            _resolve_pending(self._slot_waiters.popleft(), None)
+
+    def _release_queue_slots(self, count: int) -> None:
+        with self._queue_cv:
+            self._queued_requests -= count
+            self._queue_cv.notify(count)
+            self._wake_slot_waiters(count)
+
+    def _process_response(self, response: Any, req_id: int) -> None:
+        """
+        Process responses from the data servicer. req_id is the non-zero
+        response.req_id, already read by the caller.
+        """
+        # NOTE: calling self.asyncio_waiting_data.pop() results
+        # in the destructor of ClientObjectRef running, which
+        # calls ReleaseObject(). So self.asyncio_waiting_data
+        # is accessed without holding self.lock. Holding the
+        # lock shouldn't be necessary either.
+        callback = self.asyncio_waiting_data.pop(req_id, _NOT_WAITING)
+        if callback is _NOT_WAITING:
+            pending = self._pending.pop(req_id, None)
+            if pending is not None:
+                _resolve_pending(pending, response)
+            return
+        try:
+            if callback:
+                callback(response)
+        except Exception:
+            logger.exception("Callback error:")
+        with self.lock:
+            # Update outstanding requests
+            if self.outstanding_requests.pop(req_id, None) is not None:
+                # Acknowledge response
+                self._acknowledge(req_id)
 
     def _can_reconnect(self, e: grpc.RpcError) -> bool:
         """
@@ -160,10 +410,9 @@ class DataClient:
         """
         with self.lock:
             self._in_shutdown = True
-            self.cv.notify_all()
-
             callbacks = self.asyncio_waiting_data.values()
             self.asyncio_waiting_data = {}
+        self._wake_pending()
 
         if self._last_exception:
             # Abort async requests with the error.
@@ -180,6 +429,27 @@ class DataClient:
         # Since self._in_shutdown is set to True, no new item
         # will be added to self.asyncio_waiting_data
 
+    def _wake_pending(self) -> None:
+        """
+        Wakes up all requests waiting for a response or for room on the
+        request queue, and the release thread. Must only be called after
+        self._in_shutdown is set, so no new waiters are added and the woken
+        ones fail in self._check_shutdown().
+        """
+        with self._queue_cv:
+            self._queue_cv.notify_all()
+            self._wake_slot_waiters()
+        with self._release_cv:
+            # Lets the release thread exit.
+            self._release_cv.notify_all()
+        while self._pending:
+            try:
+                _, pending = self._pending.popitem()
+            except KeyError:
+                # The last response was dispatched concurrently.
+                break
+            _resolve_pending(pending, None)
+
     def _acknowledge(self, req_id: int) -> None:
         """
         Puts an acknowledge request on the request queue periodically.
@@ -229,17 +499,39 @@ class DataClient:
 
         # Recreate the request queue, and resend outstanding requests
         with self.lock:
-            self.request_queue = queue.Queue()
+            # Requests left on the old queue are dropped with it, and resent
+            # along with the other outstanding requests.
+            dropped = 0
+            while True:
+                try:
+                    request = self.request_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is not None and request.req_id != 0:
+                    dropped += 1
+            self.request_queue = queue.SimpleQueue()
             for request in self.outstanding_requests.values():
                 # Resend outstanding requests
                 self.request_queue.put(request)
+            with self._queue_cv:
+                # Adjust the count rather than resetting it, since senders
+                # that reserved a slot but haven't queued their request yet
+                # aren't in self.outstanding_requests.
+                self._queued_requests += \
+                    len(self.outstanding_requests) - dropped
+                self._queue_cv.notify_all()
+                self._wake_slot_waiters()
 
     def close(self) -> None:
         thread = None
+        with self._release_lock:
+            # The server releases everything held for this client when the
+            # connection is cleaned up.
+            self._pending_releases = []
         with self.lock:
             self._in_shutdown = True
             # Notify blocking operations to fail.
-            self.cv.notify_all()
+            self._wake_pending()
             # Add sentinel to terminate streaming RPC.
             if self.request_queue is not None:
                 # Intentional shutdown, tell server it can clean up the
@@ -257,34 +549,105 @@ class DataClient:
 
     def _blocking_send(self, req: ray_client_pb2.DataRequest
                        ) -> ray_client_pb2.DataResponse:
+        future = Future()
+        req_id = self._send_pending(req, (None, future))
+        data = future.result()
+        self._complete_pending(req_id, data)
+        return data
+
+    async def _async_send_await(self, req: ray_client_pb2.DataRequest
+                                ) -> ray_client_pb2.DataResponse:
+        """
+        Like _blocking_send(), but awaits the response on the running event
+        loop instead of blocking the calling thread.
+        """
+        loop = asyncio.get_running_loop()
+        if self._pending_releases:
+            # Like _flush_releases(), but without blocking the event loop.
+            await self._acquire_queue_slot_async()
+            self._put_releases()
+        await self._acquire_queue_slot_async()
+        future = loop.create_future()
+        req_id = self._put_pending(req, (loop, future))
+        try:
+            data = await future
+        except asyncio.CancelledError:
+            # Nothing waits for the response anymore, and the request won't
+            # be resent on reconnect, so stop tracking it altogether.
+            self._pending.pop(req_id, None)
+            with self.lock:
+                self.outstanding_requests.pop(req_id, None)
+            raise
+        self._complete_pending(req_id, data)
+        return data
+
+    def _send_pending(self, req: ray_client_pb2.DataRequest,
+                      pending: PendingResponse) -> int:
+        """
+        Sends a request whose response is delivered through the given future.
+        Returns the req_id assigned to the request.
+        """
+        if self._pending_releases:
+            self._flush_releases()
+        self._acquire_queue_slot()
+        return self._put_pending(req, pending)
+
+    def _put_pending(self, req: ray_client_pb2.DataRequest,
+                     pending: PendingResponse) -> int:
+        """
+        Queues a request for _send_pending() once it holds a queue slot.
+        """
         with self.lock:
             self._check_shutdown()
             req_id = self._next_id()
             req.req_id = req_id
+            self._pending[req_id] = pending
             self.request_queue.put(req)
             self.outstanding_requests[req_id] = req
+        return req_id
 
-            self.cv.wait_for(
-                lambda: req_id in self.ready_data or self._in_shutdown)
-            self._check_shutdown()
-
-            data = self.ready_data[req_id]
-            del self.ready_data[req_id]
+    def _complete_pending(
+            self, req_id: int,
+            data: Optional[ray_client_pb2.DataResponse]) -> None:
+        """
+        Stops tracking a request sent with _send_pending() once its future
+        is resolved. Raises if the future was resolved by a shutdown rather
+        than by a response.
+        """
+        with self.lock:
+            if data is None:
+                self._check_shutdown()
             del self.outstanding_requests[req_id]
             self._acknowledge(req_id)
 
-        return data
-
     def _async_send(self,
                     req: ray_client_pb2.DataRequest,
                     callback: Optional[ResponseCallable] = None) -> None:
+        if self._pending_releases:
+            # Keep buffered releases ordered before the requests that follow
+            # them, e.g. a get that hands out a new ref to a released object.
+            self._flush_releases()
+        self._acquire_queue_slot()
+        self._put_async(req, callback)
+
+    def _put_async(self,
+                   req: ray_client_pb2.DataRequest,
+                   callback: Optional[ResponseCallable] = None) -> None:
+        """
+        Queues a request for _async_send() once it holds a queue slot.
+        """
         with self.lock:
             self._check_shutdown()
-            req_id = self._next_id()
-            req.req_id = req_id
-            self.asyncio_waiting_data[req_id] = callback
-            self.outstanding_requests[req_id] = req
-            self.request_queue.put(req)
+            self._enqueue_async(req, callback)
+
+    # Must hold self.lock when calling this function.
+    def _enqueue_async(self, req: ray_client_pb2.DataRequest,
+                       callback: Optional[ResponseCallable]) -> None:
+        req_id = self._next_id()
+        req.req_id = req_id
+        self.asyncio_waiting_data[req_id] = callback
+        self.outstanding_requests[req_id] = req
+        self.request_queue.put(req)
 
     # Must hold self.lock when calling this function.
     def _check_shutdown(self):
@@ -320,6 +683,12 @@ class DataClient:
         resp = self._blocking_send(datareq)
         return resp.init
 
+    async def InitAsync(self, request: ray_client_pb2.InitRequest
+                        ) -> ray_client_pb2.InitResponse:
+        datareq = ray_client_pb2.DataRequest(init=request, )
+        resp = await self._async_send_await(datareq)
+        return resp.init
+
     def PrepRuntimeEnv(self,
                        request: ray_client_pb2.PrepRuntimeEnvRequest,
                        context=None) -> ray_client_pb2.PrepRuntimeEnvResponse:
@@ -340,12 +709,28 @@ class DataClient:
         resp = self._blocking_send(datareq)
         return resp.get
 
-    def RegisterGetCallback(self, request: ray_client_pb2.GetRequest,
-                            callback: ResponseCallable) -> None:
+    async def GetObjectAsync(self, request: ray_client_pb2.GetRequest
+                             ) -> ray_client_pb2.GetResponse:
+        datareq = ray_client_pb2.DataRequest(get=request, )
+        resp = await self._async_send_await(datareq)
+        return resp.get
+
+    def RegisterGetCallback(
+            self,
+            request: ray_client_pb2.GetRequest,
+            callback: ResponseCallable,
+            loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """
+        Registers a callback for the response to an asynchronous get. If a
+        loop is given, the callback is run on that event loop instead of on
+        the data thread.
+        """
         if len(request.ids) != 1:
             raise ValueError(
                 "RegisterGetCallback() must have exactly 1 Object ID. "
                 f"Actual: {request}")
+        if loop is not None:
+            callback = _loop_callback(callback, loop)
         datareq = ray_client_pb2.DataRequest(get=request, )
         self._async_send(datareq, callback)
 
@@ -356,11 +741,68 @@ class DataClient:
         resp = self._blocking_send(datareq)
         return resp.put
 
+    async def PutObjectAsync(self, request: ray_client_pb2.PutRequest
+                             ) -> ray_client_pb2.PutResponse:
+        datareq = ray_client_pb2.DataRequest(put=request, )
+        resp = await self._async_send_await(datareq)
+        return resp.put
+
     def ReleaseObject(self,
                       request: ray_client_pb2.ReleaseRequest,
                       context=None) -> None:
-        datareq = ray_client_pb2.DataRequest(release=request, )
-        self._async_send(datareq)
+        with self._release_lock:
+            self._pending_releases.extend(request.ids)
+            self._release_cv.notify()
+
+    def _flush_releases(self) -> None:
+        """
+        Sends all buffered releases to the server as one ReleaseRequest.
+        """
+        self._acquire_queue_slot()
+        self._put_releases()
+
+    def _put_releases(self) -> None:
+        """
+        Queues all buffered releases as one ReleaseRequest, once the caller
+        holds a queue slot for it. The buffer is emptied in the same
+        self.lock section that queues the request, so a request sent after
+        the releases were taken can't be queued ahead of them.
+        """
+        with self.lock:
+            self._check_shutdown()
+            with self._release_lock:
+                ids = self._pending_releases
+                self._pending_releases = []
+            if ids:
+                self._enqueue_async(_release_request(ids), None)
+        if not ids:
+            # Flushed by another sender in the meantime.
+            self._release_queue_slots(1)
+
+    def _release_main(self) -> None:
+        """
+        Flushes buffered releases once RELEASE_BATCH_SIZE have accumulated,
+        or RELEASE_FLUSH_INTERVAL_S after they start accumulating, until the
+        data client shuts down.
+        """
+        while True:
+            with self._release_cv:
+                self._release_cv.wait_for(
+                    lambda: self._pending_releases or self._in_shutdown)
+                # Give the rest of a burst of releases time to arrive,
+                # unless a full batch is buffered already.
+                self._release_cv.wait_for(
+                    lambda: len(self._pending_releases) >= RELEASE_BATCH_SIZE
+                    or self._in_shutdown,
+                    timeout=RELEASE_FLUSH_INTERVAL_S)
+            if self._in_shutdown:
+                return
+            try:
+                self._flush_releases()
+            except ConnectionError:
+                logger.debug("Dropping buffered releases, the data client "
+                             "has disconnected.")
+                return
 
     def Schedule(self, request: ray_client_pb2.ClientTask,
                  callback: ResponseCallable):
@@ -63,11 +63,16 @@ def fill_queue(
         "Queue[Union[ray_client_pb2.DataRequest, ray_client_pb2.DataResponse]]"
 ) -> None:
     """
-    Pushes incoming requests to a shared output_queue.
+    Pushes incoming requests to a shared output_queue. Batched requests
+    are unwrapped so that the Datapath only ever sees individual requests.
     """
     try:
         for req in grpc_input_generator:
-            output_queue.put(req)
+            if req.WhichOneof("type") == "batch":
+                for batched_req in req.batch.reqs:
+                    output_queue.put(batched_req)
+            else:
+                output_queue.put(req)
     except grpc.RpcError as e:
         logger.debug("closing dataservicer reader thread "
                      f"grpc error reading request_iterator: {e}")
@@ -557,6 +557,21 @@ def prepare_runtime_init_req(init_request: ray_client_pb2.DataRequest
     return (init_request, new_job_config)
 
 
+def split_init_req(first_request: ray_client_pb2.DataRequest
+                   ) -> Tuple[ray_client_pb2.DataRequest,
+                              List[ray_client_pb2.DataRequest]]:
+    """
+    Split the first message of a new data stream into the InitRequest and
+    any requests the client batched along with it, which are forwarded to
+    the specific RayClient Server after the (possibly mutated) init.
+    """
+    if first_request.WhichOneof("type") != "batch" or \
+            not first_request.batch.reqs:
+        return first_request, []
+    reqs = list(first_request.batch.reqs)
+    return reqs[0], reqs[1:]
+
+
 class DataServicerProxy(ray_client_pb2_grpc.RayletDataStreamerServicer):
     def __init__(self, proxy_manager: ProxyManager):
         self.num_clients = 0
@@ -616,7 +631,8 @@ class DataServicerProxy(ray_client_pb2_grpc.RayletDataStreamerServicer):
         try:
             if not reconnecting:
                 logger.info(f"New data connection from client {client_id}: ")
-                init_req = next(request_iterator)
+                init_req, batched_reqs = split_init_req(
+                    next(request_iterator))
                 with self.clients_lock:
                     self.reconnect_grace_periods[client_id] = \
                         init_req.init.reconnect_grace_period
@@ -650,7 +666,8 @@ class DataServicerProxy(ray_client_pb2_grpc.RayletDataStreamerServicer):
                     yield init_resp
                     return None
 
-                new_iter = chain([modified_init_req], request_iterator)
+                new_iter = chain([modified_init_req], batched_reqs,
+                                 request_iterator)
 
             stub = ray_client_pb2_grpc.RayletDataStreamerStub(channel)
             metadata = [("client_id", client_id), ("reconnecting",
@@ -2,6 +2,7 @@
 It implements the Ray API functions that are forwarded through grpc calls
 to the server.
 """
+import asyncio
 import base64
 import json
 import logging
@@ -328,10 +329,12 @@ class Worker:
         }
 
     def register_callback(
-            self, ref: ClientObjectRef,
-            callback: Callable[[ray_client_pb2.DataResponse], None]) -> None:
+            self,
+            ref: ClientObjectRef,
+            callback: Callable[[ray_client_pb2.DataResponse], None],
+            loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
         req = ray_client_pb2.GetRequest(ids=[ref.id], asynchronous=True)
-        self.data_client.RegisterGetCallback(req, callback)
+        self.data_client.RegisterGetCallback(req, callback, loop)
 
     def get(self, vals, *, timeout: Optional[float] = None) -> Any:
         if isinstance(vals, list):